@@ -0,0 +1,16 @@
+'''
+Shared pytest fixtures for the version_checker tests
+'''
+
+import pytest
+
+import version_checker.utils as vc_utils
+
+
+VALID_CFG_FILE = '.bumpversion.cfg'
+
+
+@pytest.fixture(scope='session')
+def valid_bumpversion_config():
+    '''This repo's own .bumpversion.cfg, parsed once for the whole session'''
+    return vc_utils.get_bumpversion_config(cfg_file=VALID_CFG_FILE)
@@ -9,6 +9,9 @@ def test_get_base_commit_handles_valid_input_value():
 Pytests for the public functions of the version_checker code
 '''
 
+import io
+import re as _stdlib_re
+
 import mock
 import pytest
 
@@ -24,6 +27,7 @@ from version_checker import __version__ as _vc_version
 MALFORMATTED_CFG_FILE = 'tests/bad_config_malformatted.txt'
 NOSECTIONS_CFG_FILE = 'tests/bad_config_sections.txt'
 EMPTY_CFG_FILE = 'tests/ok_config_empty.txt'
+TOML_CFG_FILE = 'tests/ok_config_pyproject.toml'
 VALID_CFG_FILE = '.bumpversion.cfg'
 
 # based on this repos valid cfg, list the files we expect to use
@@ -39,19 +43,35 @@ KNOWN_FILE_DEFAULTS = {
     'version_checker/examples/openapi-spec.json': False,
     'version_checker/examples/pom.xml': False
 }
+KNOWN_FILES = frozenset(KNOWN_FILE_DEFAULTS)
 
 BAD_VERSION = '0.0.0'
 #endregion
 
 
+#region test helpers
+def _mock_tree(*paths):
+    '''Build a mock git.Tree which resolves the given paths to blobs (KeyError otherwise)'''
+    tree = mock.MagicMock(spec=git.Tree)
+    blobs = {}
+    for path in paths:
+        blob = mock.MagicMock(spec=git.Blob)
+        blob.type = 'blob'
+        blob.path = path
+        blobs[path] = blob
+    tree.__truediv__.side_effect = lambda path: blobs[path]
+    return tree
+#endregion
+
+
 #region get_base_commit tests
 def test_get_base_commit_errors_for_bad_repo(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     fake_repo = None
     fake_base = None
     retval = vc_utils.get_base_commit(fake_repo, fake_base)
     assert not retval
-    patched_sys.exit.assert_called_once_with(1)
+    patched_exit.assert_called_once_with(1)
 
 
 def test_get_base_commit_handles_valid_input_value():
@@ -63,27 +83,50 @@ def test_get_base_commit_handles_valid_input_value():
     fake_repo.commit.assert_called_once_with(fake_base)
 
 
-def test_get_base_commit_attempts_defaults_if_None():
+def _patch_remote_refs(mocker, existing):
+    '''patches git.RemoteReference so only the refs in existing ({path: commit}) are valid'''
+    def _fake_ref(_repo, path):
+        ref = mock.Mock()
+        ref.is_valid.return_value = path in existing
+        ref.commit = existing.get(path)
+        return ref
+    return mocker.patch.object(git, 'RemoteReference', side_effect=_fake_ref)
+
+
+def test_get_base_commit_attempts_defaults_if_None(mocker):
+    patched_ref = _patch_remote_refs(
+        mocker, {f'refs/remotes/{_constants.BASES_IF_NONE[0]}': 'expect_me'})
     fake_repo = mock.Mock()
-    fake_repo.commit.return_value = 'expect_me'
     fake_base = None
     retval = vc_utils.get_base_commit(fake_repo, fake_base)
     assert retval == 'expect_me'
-    fake_repo.commit.assert_called_once_with(_constants.BASES_IF_NONE[0])
+    patched_ref.assert_called_once_with(fake_repo, f'refs/remotes/{_constants.BASES_IF_NONE[0]}')
+    fake_repo.commit.assert_not_called()
 
 
 def test_get_base_commit_errors_for_no_valid_base(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    patched_ref = _patch_remote_refs(mocker, {'refs/remotes/origin/some-other-branch': 'not_me'})
     fake_repo = mock.Mock()
-    num_bases = len(_constants.BASES_IF_NONE)
-    fake_repo.commit.side_effect = [git.exc.BadName('dne')] * num_bases
     fake_base = None
     retval = vc_utils.get_base_commit(fake_repo, fake_base)
     assert not retval
-    fake_repo.commit.assert_has_calls(
-        list(map(lambda b: mock.call(b), _constants.BASES_IF_NONE))
-    )
-    patched_sys.exit.assert_called_once_with(1)
+    assert patched_ref.call_count == len(_constants.BASES_IF_NONE)
+    fake_repo.commit.assert_not_called()
+    patched_exit.assert_called_once_with(1)
+
+
+def test_get_base_commit_falls_back_to_later_default(mocker):
+    _patch_remote_refs(mocker, {
+        'refs/remotes/origin/some-other-branch': 'not_me',
+        f'refs/remotes/{_constants.BASES_IF_NONE[-1]}': 'expect_me'})
+    fake_repo = mock.Mock()
+    type(fake_repo).refs = mock.PropertyMock()
+    fake_base = None
+    retval = vc_utils.get_base_commit(fake_repo, fake_base)
+    assert retval == 'expect_me'
+    fake_repo.commit.assert_not_called()
+    type(fake_repo).refs.assert_not_called()
 #endregion
 
 
@@ -109,9 +152,8 @@ def test_get_bumpversion_config_returns_nothing_if_no_files_detected():
     assert not regexes
 
 
-def test_get_bumpversion_config_handles_valid_config():
-    test_cfg_file = VALID_CFG_FILE
-    files, regexes = vc_utils.get_bumpversion_config(cfg_file=test_cfg_file)
+def test_get_bumpversion_config_handles_valid_config(valid_bumpversion_config):
+    files, regexes = valid_bumpversion_config
 
     # verify we have files & regexes & match overall expected list size
     assert len(files) == len(KNOWN_FILE_DEFAULTS)
@@ -119,11 +161,31 @@ def test_get_bumpversion_config_handles_valid_config():
 
     # verify all files are accounted for, and the ones without 'search' are defaulted
     for f, r in zip(files, regexes):
-        assert f in KNOWN_FILE_DEFAULTS.keys()
+        assert f in KNOWN_FILES
         if KNOWN_FILE_DEFAULTS[f]:
             assert r == _vc_version
         else:
             assert r != _vc_version
+
+
+@pytest.mark.skipif(vc_utils.tomllib is None, reason='tomllib requires python 3.11+')
+def test_get_bumpversion_config_handles_toml_config():
+    test_cfg_file = TOML_CFG_FILE
+    files, regexes = vc_utils.get_bumpversion_config(cfg_file=test_cfg_file)
+    assert files == ['setup.cfg', 'version_checker/examples/version.txt']
+    assert regexes == ['version = 0.1.2', '0.1.2']
+
+
+def test_get_bumpversion_config_caches_parsed_config(mocker):
+    test_cfg_file = VALID_CFG_FILE
+    vc_utils._CFG_CACHE.clear()
+    spied_read = mocker.spy(vc_utils.configparser.ConfigParser, 'read_string')
+
+    first = vc_utils.get_bumpversion_config(cfg_file=test_cfg_file)
+    second = vc_utils.get_bumpversion_config(cfg_file=test_cfg_file)
+
+    assert first == second
+    spied_read.assert_called_once()
 #endregion
 
 
@@ -140,6 +202,94 @@ def test_search_commit_file_handles_invalid_file(mocker):
     patched_err.assert_called_once()
 
 
+def test_search_commit_file_looks_up_path_and_reads_blob_once(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    commit_mock = mock.MagicMock(spec=git.Commit)
+    commit_mock.tree = _mock_tree('src/version.txt')
+    blob_mock = commit_mock.tree / 'src/version.txt'
+    blob_mock.size = 5
+    blob_mock.data_stream.read.return_value = b'1.2.3'
+
+    for _ in range(2):
+        ret = vc_utils.search_commit_file(commit_mock, 'src/version.txt', r'[0-9.]+', abort=False)
+        assert ret == '1.2.3'
+    commit_mock.tree.traverse.assert_not_called()
+    blob_mock.data_stream.read.assert_called_once()
+    patched_err.assert_not_called()
+
+
+def test_read_blob_caches_bounded_by_blob_sha(mocker):
+    mocker.patch.dict(vc_utils._BLOB_CACHE, clear=True)
+    first, same_sha = mock.MagicMock(spec=git.Blob), mock.MagicMock(spec=git.Blob)
+    first.binsha = same_sha.binsha = b'a' * 20
+    first.data_stream.read.return_value = b'1.2.3'
+
+    assert vc_utils._read_blob(first) == b'1.2.3'
+    assert vc_utils._read_blob(same_sha) == b'1.2.3'
+    same_sha.data_stream.read.assert_not_called()
+
+    for _i in range(vc_utils._BLOB_CACHE_SIZE):
+        other = mock.MagicMock(spec=git.Blob)
+        other.binsha = bytes([_i]) * 20
+        vc_utils._read_blob(other)
+    assert len(vc_utils._BLOB_CACHE) == vc_utils._BLOB_CACHE_SIZE
+    assert first.binsha not in vc_utils._BLOB_CACHE
+
+
+def test_search_commit_file_streams_large_blobs(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched_scan = mocker.spy(vc_utils, '_scan_stream')
+    mocker.patch.object(vc_utils, '_STREAM_THRESHOLD', 8)
+    commit_mock = mock.MagicMock(spec=git.Commit)
+    commit_mock.tree = _mock_tree('big.txt')
+    blob_mock = commit_mock.tree / 'big.txt'
+    blob_mock.size = 1024
+    blob_mock.data_stream = io.BytesIO(b'x' * 300 + b'version 4.5.6' + b'y' * 700)
+
+    ret = vc_utils.search_commit_file(commit_mock, 'big.txt', r'version [0-9.]+', abort=False)
+    assert ret == 'version 4.5.6'
+    patched_scan.assert_called_once()
+    patched_err.assert_not_called()
+
+
+def test_scan_stream_stops_after_match():
+    stream = io.BytesIO(b'x' * 300 + b'version 4.5.6' + b'y' * 5000)
+    window = vc_utils._scan_stream(stream, r'version [0-9.]+', chunk_size=128)
+    assert b'version 4.5.6' in window
+    assert stream.tell() < len(stream.getvalue())
+    assert vc_utils._scan_stream(io.BytesIO(b'z' * 500), r'version', chunk_size=128) == b''
+
+
+def test_scan_stream_matches_across_chunk_boundary(mocker):
+    mocker.patch.object(vc_utils, '_STREAM_OVERLAP', 16)
+    data = b'x' * 120 + b'version 4.5.6' + b'y' * 500
+    window = vc_utils._scan_stream(io.BytesIO(data), r'version [0-9.]+', chunk_size=128)
+    assert vc_utils._search_or_error(r'version [0-9.]+', window, abort=False) == 'version 4.5.6'
+
+
+def test_scan_stream_searches_non_ascii_windows_as_text(mocker):
+    mocker.patch.object(vc_utils, '_STREAM_OVERLAP', 16)
+    data = b'x' * 120 + 'name: José'.encode() + b' y' * 300
+    window = vc_utils._scan_stream(io.BytesIO(data), r'name: \w+', chunk_size=128)
+    assert vc_utils._search_or_error(r'name: \w+', window, abort=False) == 'name: José'
+
+
+def test_search_commit_file_reads_context_dependent_regex_whole(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched_scan = mocker.spy(vc_utils, '_scan_stream')
+    mocker.patch.object(vc_utils, '_STREAM_THRESHOLD', 8)
+    commit_mock = mock.MagicMock(spec=git.Commit)
+    commit_mock.tree = _mock_tree('big.txt')
+    blob_mock = commit_mock.tree / 'big.txt'
+    blob_mock.size = 1024
+    blob_mock.data_stream.read.return_value = b'x' * 120 + b'1.2.3\n' + b'y' * 900
+
+    ret = vc_utils.search_commit_file(commit_mock, 'big.txt', r'^[0-9.]+', abort=False)
+    assert ret == ''
+    patched_scan.assert_not_called()
+    patched_err.assert_called_once()
+
+
 def test_search_commit_file_handles_invalid_commit(mocker):
     patched_err = mocker.patch.object(vc_utils, '_error')
 
@@ -180,6 +330,132 @@ def test_search_commit_file_handles_regex_success(mocker):
     ret = vc_utils.search_commit_file('_', '_', r'regex[\w\s]*[0-9]{3}', abort=False)
     assert ret == 'regex me here123'
     patched_err.assert_not_called()
+
+
+def test_search_commit_file_skips_regex_for_plain_text_match(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched__get = mocker.patch.object(vc_utils, '_get_commit_file')
+    patched__get.return_value = b'[metadata]\nname = base-version-checker\n'
+    patched_compiled = mocker.patch.object(vc_utils, '_compiled')
+
+    ret = vc_utils.search_commit_file('_', '_', 'name = base-version-checker', abort=False)
+    assert ret == 'name = base-version-checker'
+    patched_compiled.assert_not_called()
+    patched_err.assert_not_called()
+
+
+def test_search_commit_file_returns_first_regex_match_for_dotted_text(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched__get = mocker.patch.object(vc_utils, '_get_commit_file')
+    patched__get.return_value = b'v 1x2 ... v 1.2'
+
+    assert vc_utils.search_commit_file('_', '_', 'v 1.2', abort=False) == 'v 1x2'
+    patched_err.assert_not_called()
+
+
+def test_search_commit_file_reuses_compiled_regex(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched__get = mocker.patch.object(vc_utils, '_get_commit_file')
+    patched__get.return_value = 'some content... version 1.2.3!...'
+
+    vc_utils._compiled.cache_clear()
+    vc_utils.search_commit_file('_', '_', r'[0-9]\.[0-9]\.[0-9]', abort=False)
+    ret = vc_utils.search_commit_file('_', '_', r'[0-9]\.[0-9]\.[0-9]', abort=False)
+    assert ret == '1.2.3'
+    assert vc_utils._compiled.cache_info().hits >= 1
+    patched_err.assert_not_called()
+
+
+def test_search_commit_file_default_regex_excludes_trailing_text(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched__get = mocker.patch.object(vc_utils, '_get_commit_file')
+    patched__get.return_value = b'[bumpversion]\ncurrent_version = 0.2.3-alpha.1.\n'
+
+    ret = vc_utils.search_commit_file('_', '_', _constants.VERSION_REGEX, abort=False)
+    assert ret == '0.2.3-alpha.1'
+    patched_err.assert_not_called()
+
+
+def test_search_commit_file_redoes_split_character_match_as_text(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched__get = mocker.patch.object(vc_utils, '_get_commit_file')
+    patched__get.return_value = 'name: é\n'.encode()
+
+    ret = vc_utils.search_commit_file('_', '_', r'name: .', abort=False)
+    assert ret == 'name: é'
+    patched_err.assert_not_called()
+
+
+def test_search_or_error_searches_non_ascii_content_as_text():
+    assert vc_utils._search_or_error(r'name: \w+', 'name: José 1'.encode()) == 'name: José'
+    assert vc_utils._search_or_error(r'v: ..', 'v: é1'.encode()) == 'v: é1'
+
+
+def test_search_or_error_keeps_compiled_pattern_flags():
+    regex = vc_utils.re.compile('VERSION=[0-9.]+', vc_utils.re.IGNORECASE)
+    assert vc_utils._search_or_error(regex, b'version=1.2.3') == 'version=1.2.3'
+    assert vc_utils._search_or_error(vc_utils.re.compile('VERSION', vc_utils.re.I), b'version') \
+        == 'version'
+
+
+def test_search_commit_file_searches_non_ascii_regex_as_text(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched__get = mocker.patch.object(vc_utils, '_get_commit_file')
+    patched__get.return_value = 'Versión 1.2.3\n'.encode()
+
+    ret = vc_utils.search_commit_file('_', '_', r'(?i)VERSIÓN [0-9.]+', abort=False)
+    assert ret == 'Versión 1.2.3'
+    patched_err.assert_not_called()
+
+
+def test_is_ascii_works_without_isascii():
+    class _OldStr(str):
+        # python 3.6 str has no isascii
+        isascii = property(lambda self: (_ for _ in ()).throw(AttributeError))
+
+    assert vc_utils._is_ascii('version = 1.2.3')
+    assert not vc_utils._is_ascii('versión')
+    assert vc_utils._is_ascii(b'1.2.3') and not vc_utils._is_ascii('é'.encode())
+    assert not hasattr(_OldStr('x'), 'isascii')
+    assert vc_utils._is_ascii(_OldStr('1.2.3')) and not vc_utils._is_ascii(_OldStr('é'))
+
+
+def test_search_commit_files_returns_matches_in_order(mocker):
+    patched_err = mocker.patch.object(vc_utils, '_error')
+    patched__get = mocker.patch.object(vc_utils, '_get_commit_file')
+    patched__get.side_effect = ['version = 1.2.3', 'VERSION=1.2.4']
+
+    ret = list(vc_utils.search_commit_files(
+        '_', [('setup.cfg', r'version = [0-9.]+'), ('.env', r'VERSION=[0-9.]+')], abort=False))
+    assert ret == ['version = 1.2.3', 'VERSION=1.2.4']
+    patched_err.assert_not_called()
+
+
+def test_search_commit_files_searches_repeated_pairs_once(mocker):
+    patched_search = mocker.patch.object(vc_utils, 'search_commit_file')
+    patched_search.return_value = '1.2.3'
+
+    ret = list(vc_utils.search_commit_files(
+        '_', [('version.txt', r'[0-9.]+'), ('version.txt', r'[0-9.]+')], abort=False))
+    assert ret == ['1.2.3', '1.2.3']
+    patched_search.assert_called_once()
+
+
+def test_compile_regex_returns_cached_pattern():
+    pattern = vc_utils.compile_regex(r'[0-9]+\.[0-9]+')
+    assert pattern.search('v1.2') is not None
+    assert vc_utils.compile_regex(r'[0-9]+\.[0-9]+') is pattern
+
+
+def test_compile_regex_accepts_stdlib_patterns():
+    pattern = vc_utils.compile_regex(_stdlib_re.compile('VERSION=[0-9.]+', _stdlib_re.I))
+    assert pattern.search('version=1.2.3').group(0) == 'version=1.2.3'
+    assert vc_utils._search_or_error(_stdlib_re.compile('[0-9.]+'), b'v 1.2.3') == '1.2.3'
+
+
+def test_compile_regex_rejects_invalid_pattern():
+    with pytest.raises(ValueError):
+        vc_utils.compile_regex('version = [')
 #endregion
 
 
@@ -201,13 +477,15 @@ def test_install_hook_handles_hook_already_exists(mocker):
     patched_shutil = mocker.patch.object(vc_utils, 'shutil')
     patched_err = mocker.patch.object(vc_utils, '_error')
     patched_os = mocker.patch.object(vc_utils, 'os')
-    
-    patched_os.path.islink.return_value = True
+    patched_ok = mocker.patch.object(vc_utils, '_ok')
+
+    patched_os.symlink.side_effect = FileExistsError('hook exists')
 
     vc_utils.install_hook('pre-push')
 
     patched_err.assert_called_once()
-    patched_os.symlink.assert_not_called()
+    patched_os.symlink.assert_called_once()
+    patched_ok.assert_not_called()
 
 
 def test_install_hook_creates_link_if_dne(mocker):
@@ -215,9 +493,6 @@ def test_install_hook_creates_link_if_dne(mocker):
     patched_err = mocker.patch.object(vc_utils, '_error')
     patched_os = mocker.patch.object(vc_utils, 'os')
 
-    patched_os.path.islink.return_value = False
-    patched_os.path.exists.return_value = False
-
     vc_utils.install_hook('pre-push')
 
     patched_err.assert_not_called()
@@ -229,7 +504,27 @@ def test_install_hook_creates_link_if_dne(mocker):
 def test_do_update_calls_bump2version(mocker):
     patched_sp = mocker.patch.object(vc_utils, 'subprocess')
     vc_utils.do_update('minor')
-    patched_sp.check_output.assert_called_once_with('bump2version minor --allow-dirty', shell=True)
+    patched_sp.run.assert_called_once_with(
+        ['bump2version', 'minor', '--allow-dirty'], check=True, stdout=patched_sp.PIPE)
+#endregion
+
+
+#region compare_versions tests
+def test_compare_versions_rejects_identical_versions_without_parsing(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    patched_semver = mocker.patch.object(vc_utils, 'semver')
+    patched_semver.VersionInfo.parse.side_effect = AssertionError('should not parse')
+
+    assert not vc_utils.compare_versions('1.2.3', '1.2.3', abort=True)
+    patched_semver.VersionInfo.parse.assert_not_called()
+    patched_exit.assert_called_once_with(1)
+
+
+def test_compare_versions_reuses_parsed_versions():
+    vc_utils._parse_version.cache_clear()
+    assert vc_utils.compare_versions('1.2.3', '1.2.4')
+    assert vc_utils.compare_versions('1.2.3', '1.2.4')
+    assert vc_utils._parse_version.cache_info().hits >= 2
 #endregion
 
 
@@ -237,49 +532,78 @@ def test_do_update_calls_bump2version(mocker):
 #   Note: not doing fully strict input validation, maybe eventually but the docstring
 #   is pretty explicit about using GitPython
 def test_do_check_handles_empty_file_list(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
     files = []
     file_regexes = ['0.0.1']
     
     assert not vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
-    patched_sys.exit.assert_called_once_with(1)
+    patched_exit.assert_called_once_with(1)
 
 
 def test_do_check_handles_empty_file_regex_list(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
     files = ['version.txt']
     file_regexes = []
     
     assert not vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
-    patched_sys.exit.assert_called_once_with(1)
+    patched_exit.assert_called_once_with(1)
+
+
+def test_do_check_handles_same_commit(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    patched_has_file = mocker.patch.object(vc_utils, '_has_file')
+    commit_mock = mock.MagicMock(spec=git.Commit)
+    files = ['version.txt']
+    file_regexes = [_vc_version]
+
+    assert not vc_utils.do_check(commit_mock, commit_mock, files, file_regexes)
+    patched_exit.assert_called_once_with(1)
+    patched_has_file.assert_not_called()
 
 
 def test_do_check_handles_file_not_changed(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     patched_ok = mocker.patch.object(vc_utils, '_ok')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
     files = ['version.txt']
     file_regexes = ['0.0.1']
 
-    base_commit_mock.tree = ''
-    base_commit_mock.diff.iter_change_type.return_value = ''
+    base_commit_mock.tree = _mock_tree()
+    current_commit_mock.tree = _mock_tree()
     
     assert not vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
-    patched_sys.exit.assert_called_once_with(1)
+    patched_exit.assert_called_once_with(1)
     patched_ok.assert_not_called()
 
 
+def test_do_check_handles_file_with_same_blob(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    patched_search = mocker.patch.object(vc_utils, 'search_commit_file')
+    base_commit_mock = mock.MagicMock(spec=git.Commit)
+    current_commit_mock = mock.MagicMock(spec=git.Commit)
+    files = ['version.txt']
+    file_regexes = [_vc_version]
+
+    base_commit_mock.tree = _mock_tree('version.txt')
+    current_commit_mock.tree = _mock_tree('version.txt')
+    (base_commit_mock.tree / 'version.txt').binsha = b'same'
+    (current_commit_mock.tree / 'version.txt').binsha = b'same'
+
+    assert not vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
+    patched_exit.assert_called_once_with(1)
+    patched_search.assert_not_called()
+    base_commit_mock.diff.assert_not_called()
+
+
 def test_do_check_handles_file_changed_but_no_version_change(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
-    blob_mock = mock.MagicMock(spec=git.Blob)
-    blob_mock.b_path = 'version.txt'
 
     old_ver = _vc_version
     new_ver = _vc_version
@@ -291,24 +615,39 @@ def test_do_check_handles_file_changed_but_no_version_change(mocker):
     files = ['version.txt']
     file_regexes = [_vc_version]
 
-    base_commit_mock.tree = ['version.txt']
-    current_commit_mock.tree = ['version.txt']
-    base_commit_mock.diff().iter_change_type.return_value = [blob_mock]
+    base_commit_mock.tree = _mock_tree('version.txt')
+    current_commit_mock.tree = _mock_tree('version.txt')
     
     assert not vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
     patched_ok.assert_called_once()
-    patched_sys.exit.assert_called_once_with(1)
+    patched_exit.assert_called_once_with(1)
+
+
+def test_do_check_reads_old_version_of_nested_version_file(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    patched_search = mocker.patch.object(vc_utils, 'search_commit_file')
+    patched_search.side_effect = ['0.0.1', '0.0.2']
+    base_commit_mock = mock.MagicMock(spec=git.Commit)
+    current_commit_mock = mock.MagicMock(spec=git.Commit)
+    files = ['pkg/version.txt']
+    file_regexes = [_vc_version]
+
+    base_commit_mock.tree = _mock_tree('pkg/version.txt')
+    current_commit_mock.tree = _mock_tree('pkg/version.txt')
+
+    assert vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
+    assert patched_search.call_count == 2
+    base_commit_mock.tree.traverse.assert_not_called()
+    patched_exit.assert_not_called()
 
 
 def test_do_check_handles_release_and_build_number_addition(mocker):
     # DISCLAIMER: see semver.org for more details on versioning
     #   0.0.0-rc.0 < 0.0.0
     #   0.0.0 < 0.0.1-rc.0
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
-    blob_mock = mock.MagicMock(spec=git.Blob)
-    blob_mock.b_path = 'version.txt'
 
     old_ver = '0.0.0'
     new_ver = '0.0.1-alpha.0'
@@ -320,21 +659,18 @@ def test_do_check_handles_release_and_build_number_addition(mocker):
     files = ['version.txt']
     file_regexes = [old_ver, old_ver]
 
-    base_commit_mock.tree = ['version.txt']
-    current_commit_mock.tree = ['version.txt']
-    base_commit_mock.diff().iter_change_type.return_value = [blob_mock]
+    base_commit_mock.tree = _mock_tree('version.txt')
+    current_commit_mock.tree = _mock_tree('version.txt')
 
     assert vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
     patched_ok.assert_called()
-    patched_sys.exit.assert_not_called()
+    patched_exit.assert_not_called()
 
 
 def test_do_check_detects_other_file_mismatch(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
-    blob_mock = mock.MagicMock(spec=git.Blob)
-    blob_mock.b_path = 'version.txt'
 
     old_ver = '0.0.1'
     new_ver = '0.0.2'
@@ -346,20 +682,127 @@ def test_do_check_detects_other_file_mismatch(mocker):
     files = ['version.txt', 'some_other_file.txt']
     file_regexes = [_vc_version]
 
-    base_commit_mock.tree = ['version.txt']
-    current_commit_mock.tree = ['version.txt']
-    base_commit_mock.diff().iter_change_type.return_value = [blob_mock]
+    base_commit_mock.tree = _mock_tree('version.txt')
+    current_commit_mock.tree = _mock_tree('version.txt')
     
     assert not vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
-    patched_sys.exit.assert_called_once_with(1)
+    patched_exit.assert_called_once_with(1)
+
+
+def test_do_check_detects_version_embedded_in_larger_version(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    base_commit_mock = mock.MagicMock(spec=git.Commit)
+    current_commit_mock = mock.MagicMock(spec=git.Commit)
+
+    old_ver = '1.0.0'
+    new_ver = '1.0.1'
+    other_file_ver = 'version = 11.0.10'
+
+    patched_search = mocker.patch.object(vc_utils, 'search_commit_file')
+    patched_search.side_effect = [old_ver, new_ver, other_file_ver]
+
+    files = ['version.txt', 'some_other_file.txt']
+    file_regexes = [_vc_version]
+
+    base_commit_mock.tree = _mock_tree('version.txt')
+    current_commit_mock.tree = _mock_tree('version.txt')
+
+    assert not vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
+    patched_exit.assert_called_once_with(1)
+
+
+def test_do_check_accepts_version_with_extra_part(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    base_commit_mock = mock.MagicMock(spec=git.Commit)
+    current_commit_mock = mock.MagicMock(spec=git.Commit)
+
+    old_ver = '1.0.0'
+    new_ver = '1.0.1'
+    other_file_ver = 'AssemblyVersion("1.0.1.0")'
+
+    patched_search = mocker.patch.object(vc_utils, 'search_commit_file')
+    patched_search.side_effect = [old_ver, new_ver, other_file_ver]
+
+    files = ['version.txt', 'AssemblyInfo.cs']
+    file_regexes = [_vc_version, r'AssemblyVersion\("1\.0\.1\.0"\)']
+
+    base_commit_mock.tree = _mock_tree('version.txt')
+    current_commit_mock.tree = _mock_tree('version.txt')
+
+    assert vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
+    patched_exit.assert_not_called()
+
+
+@pytest.mark.skipif(vc_utils.tomllib is None, reason='tomllib requires python 3.11+')
+def test_do_check_reads_toml_version_file_current_version(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    base_commit_mock = mock.MagicMock(spec=git.Commit)
+    current_commit_mock = mock.MagicMock(spec=git.Commit)
+    files = ['pyproject.toml']
+    file_regexes = [_constants.DEFAULT_VERSION_REGEX]
+
+    base_commit_mock.tree = _mock_tree('pyproject.toml')
+    current_commit_mock.tree = _mock_tree('pyproject.toml')
+    pyproject = '[build-system]\nrequires = ["setuptools>=61.0.0"]\n\n' \
+                '[tool.bumpversion]\ncurrent_version = "{}"\n'
+    (base_commit_mock.tree / 'pyproject.toml').data_stream.read.return_value = \
+        pyproject.format('0.1.2').encode()
+    (current_commit_mock.tree / 'pyproject.toml').data_stream.read.return_value = \
+        pyproject.format('0.1.3').encode()
+
+    assert vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
+    patched_exit.assert_not_called()
+
+
+@pytest.mark.skipif(vc_utils.tomllib is None, reason='tomllib requires python 3.11+')
+def test_do_check_searches_toml_version_file_with_explicit_regex(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    base_commit_mock = mock.MagicMock(spec=git.Commit)
+    current_commit_mock = mock.MagicMock(spec=git.Commit)
+    files = ['pyproject.toml']
+    file_regexes = [r'(?m)(?<=^version = ")[0-9.]+']
+
+    base_commit_mock.tree = _mock_tree('pyproject.toml')
+    current_commit_mock.tree = _mock_tree('pyproject.toml')
+    (base_commit_mock.tree / 'pyproject.toml').size = 64
+    (current_commit_mock.tree / 'pyproject.toml').size = 64
+    pyproject = '[project]\nversion = "{}"\n\n[tool.bumpversion]\ncurrent_version = "9.9.9"\n'
+    (base_commit_mock.tree / 'pyproject.toml').data_stream.read.return_value = \
+        pyproject.format('0.1.2').encode()
+    (current_commit_mock.tree / 'pyproject.toml').data_stream.read.return_value = \
+        pyproject.format('0.1.3').encode()
+
+    assert vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
+    patched_exit.assert_not_called()
+
+
+def test_do_check_fail_fast_stops_at_first_mismatch(mocker):
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
+    base_commit_mock = mock.MagicMock(spec=git.Commit)
+    current_commit_mock = mock.MagicMock(spec=git.Commit)
+
+    old_ver = '0.0.1'
+    new_ver = '0.0.2'
+
+    patched_search = mocker.patch.object(vc_utils, 'search_commit_file')
+    patched_search.side_effect = [old_ver, new_ver, old_ver, new_ver]
+
+    files = ['version.txt', 'some_other_file.txt', 'some_other_file2.txt']
+    file_regexes = [_vc_version]
+
+    base_commit_mock.tree = _mock_tree('version.txt')
+    current_commit_mock.tree = _mock_tree('version.txt')
+
+    assert not vc_utils.do_check(
+        base_commit_mock, current_commit_mock, files, file_regexes, fail_fast=True)
+    assert patched_search.call_count == 3
+    patched_exit.assert_called_once_with(1)
 
 
 def test_do_check_verifies_all_version_changes(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
-    blob_mock = mock.MagicMock(spec=git.Blob)
-    blob_mock.b_path = 'version.txt'
 
     old_ver = '0.0.1'
     new_ver = '0.0.2'
@@ -373,21 +816,18 @@ def test_do_check_verifies_all_version_changes(mocker):
     files = ['version.txt', 'some_other_file.txt', 'some_other_file2.txt']
     file_regexes = [_vc_version]
 
-    base_commit_mock.tree = ['version.txt']
-    current_commit_mock.tree = ['version.txt']
-    base_commit_mock.diff().iter_change_type.return_value = [blob_mock]
+    base_commit_mock.tree = _mock_tree('version.txt')
+    current_commit_mock.tree = _mock_tree('version.txt')
     
     assert vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
-    patched_sys.exit.not_called()
+    patched_exit.assert_not_called()
     patched_ok.assert_called()
 
 
 def test_do_check_handles_new_file(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
-    blob_mock = mock.MagicMock(spec=git.Blob)
-    blob_mock.b_path = 'version.txt'
 
     old_ver = '0.0.1'
     new_ver = '0.0.2'
@@ -399,21 +839,18 @@ def test_do_check_handles_new_file(mocker):
     files = ['version.txt']
     file_regexes = [_vc_version]
 
-    base_commit_mock.tree = []
-    current_commit_mock.tree = ['version.txt']
-    base_commit_mock.diff().iter_change_type.return_value = [blob_mock]
+    base_commit_mock.tree = _mock_tree()
+    current_commit_mock.tree = _mock_tree('version.txt')
     
     assert vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
     patched_ok.assert_called()
-    patched_sys.exit.assert_not_called()
+    patched_exit.assert_not_called()
 
 
 def test_do_check_handles_bad_new_version(mocker):
-    patched_sys = mocker.patch.object(vc_utils, 'sys')
+    patched_exit = mocker.patch.object(vc_utils.sys, 'exit')
     base_commit_mock = mock.MagicMock(spec=git.Commit)
     current_commit_mock = mock.MagicMock(spec=git.Commit)
-    blob_mock = mock.MagicMock(spec=git.Blob)
-    blob_mock.b_path = 'version.txt'
 
     new_ver = 'completely invalid version string should get caught, logged, and return false'
 
@@ -423,10 +860,9 @@ def test_do_check_handles_bad_new_version(mocker):
     files = ['version.txt']
     file_regexes = [_vc_version]
 
-    base_commit_mock.tree = []
-    current_commit_mock.tree = ['version.txt']
-    base_commit_mock.diff().iter_change_type.return_value = [blob_mock]
+    base_commit_mock.tree = _mock_tree()
+    current_commit_mock.tree = _mock_tree('version.txt')
 
     assert not vc_utils.do_check(base_commit_mock, current_commit_mock, files, file_regexes)
-    patched_sys.exit.assert_called_once_with(1)
+    patched_exit.assert_called_once_with(1)
 #endregion
@@ -11,8 +11,8 @@ Usage:
     version_checker.py --readme
     version_checker.py -l debug
     VERSION_BASE=origin/non-main version_checker
-    version_checker.py -v version.txt -r '([0-9]+\.?){3}'
-    version_checker.py -v version.txt -r '([0-9]+\.?){3}?(\-([a-z]+)\.(\d+))'
+    version_checker.py -v version.txt -r '[0-9]+\.[0-9]+\.[0-9]+'
+    version_checker.py -v version.txt -r '[0-9]+\.[0-9]+\.[0-9]+(\-([a-z]+)\.(\d+))?'
     version_checker.py -v version.txt -f openapi-spec.json --file-regexes 'version.: \d\.\d\.\d'
 
 Can be used as a simple dev script, or a git-hook:
@@ -27,23 +27,31 @@ import logging
 import os
 import sys
 
-import git
-
 from version_checker.constants import LOG_NAME, CONFIG_FILE, BASE, CURRENT, REPO_PATH, FILES, \
-                                      VERSION_FILE, VERSION_REGEX, FILE_REGEXES, EXAMPLE_CONFIG, \
-                                      README_CONTENTS
+                                      VERSION_FILE, VERSION_REGEX, FILE_REGEXES, example_config, \
+                                      readme_contents
 from version_checker.utils import get_base_commit, do_check, do_update, install_hook, \
-                                  get_bumpversion_config
+                                  get_bumpversion_config, compile_regex
 
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 LOG = logging.getLogger(LOG_NAME)
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
 
 
 def _get_repo(repo_path=REPO_PATH):
-    '''Helper to verify a repo and return the git.Repo object'''
+    '''Helper to verify a repo and return the git.Repo object
+
+    GitPython is imported here, so commands which never touch the repo skip its import cost
+    '''
+    import git  # pylint: disable=import-outside-toplevel
     try:
-        return git.Repo(repo_path)
+        return git.Repo(repo_path, odbt=git.GitCmdObjectDB)
     except git.exc.InvalidGitRepositoryError:
         LOG.critical('This utility must be run from the root of a git repository!')
         sys.exit(1)
@@ -51,18 +59,26 @@ def _get_repo(repo_path=REPO_PATH):
 
 def _log_name_to_level(name):
     '''Helper to convert inputted log'''
-    lvl = -1
-    if name.lower() == 'debug':
-        lvl = logging.DEBUG
-    elif name.lower() == 'info':
-        lvl = logging.INFO
-    elif name.lower() == 'warning':
-        lvl = logging.WARNING
-    elif name.lower() == 'error':
-        lvl = logging.ERROR
-    else:
-        raise NotImplementedError(f'log level {name} not found')
-    return lvl
+    try:
+        return LOG_LEVELS[name.lower()]
+    except KeyError as _exc:
+        raise NotImplementedError(f'log level {name} not found') from _exc
+
+
+def _regex_arg(regex):
+    '''Helper for argparse, compiles inputted regexes so bad patterns fail at parse time'''
+    try:
+        return compile_regex(regex)
+    except ValueError as _exc:
+        raise argparse.ArgumentTypeError(str(_exc)) from _exc
+
+
+def _load_config_defaults(cfg_file=CONFIG_FILE):
+    '''Helper to get the default files & file regexes, from the bumpversion config if present'''
+    if os.path.isfile(cfg_file):
+        return get_bumpversion_config(cfg_file=cfg_file)
+    LOG.warning('bumpversion configs not found, skipping...')
+    return list(FILES), list(FILE_REGEXES)
 
 
 # main method
@@ -72,16 +88,6 @@ def main():
     arg_parser = argparse.ArgumentParser(
         description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
 
-    # verify the runlocation has a git repo
-    repo = _get_repo(REPO_PATH)
-
-    # prior to argument parsing etc., attempt to parse bumpversion config
-    files, file_regexes = FILES, FILE_REGEXES
-    if os.path.exists(CONFIG_FILE) and os.path.isfile(CONFIG_FILE):
-        files, file_regexes = get_bumpversion_config(cfg_file=CONFIG_FILE)
-    else:
-        LOG.warning('bumpversion configs not found, skipping...')
-
     _a = arg_parser.add_argument
 
     _a('--example-config', '-e', action='store_true',
@@ -95,7 +101,7 @@ def main():
        help='Install version_checker as a git hook (works best with .bumpconfig.cfg)')
     _a('--update', '-u', choices=['major', 'minor', 'patch'], default=None,
        help='Update versions via bump2version, assumes .bumpconfig.cfg')
-    _a('--log-level', '-l', choices=['info', 'debug', 'warning', 'error'], default='info',
+    _a('--log-level', '-l', choices=list(LOG_LEVELS), default='info',
        help='Set the log level for the application')
 
     _a('--base', '-b', type=str, default=BASE,
@@ -104,13 +110,17 @@ def main():
        help='Git tag/branch/hash to verify')
     _a('--version-file', '-v', type=str, default=VERSION_FILE,
        help='File to base all version checks against')
-    _a('--version-regex', '-r', type=str, default=VERSION_REGEX,
+    _a('--version-regex', '-r', type=_regex_arg, default=VERSION_REGEX,
        help='Regex to extract version out of version file')
 
-    _a('--files', '-f', nargs='+', default=files,
-       help='Files to check version number')
-    _a('--file-regexes', nargs='+', default=file_regexes,
-       help='List of regex for inputted files when checking for version #')
+    _a('--files', '-f', nargs='+', default=None,
+       help='Files to check version number (defaults to those in the bumpversion config)')
+    _a('--file-regexes', nargs='+', type=_regex_arg, default=None,
+       help='List of regex for inputted files when checking for version # '
+            '(defaults to those in the bumpversion config)')
+
+    _a('--fail-fast', action='store_true',
+       help='Stop checking files at the first one out of sync')
 
     _a('hookargs', nargs=argparse.REMAINDER,
        help='Positional args which a git hook may provide, we ignore these')
@@ -125,23 +135,34 @@ def main():
 
     elif args.example_config:
         LOG.info('Here is an example config you could tailor, then paste into '
-                 '.bumpversion.cfg: \n%s', EXAMPLE_CONFIG)
+                 '.bumpversion.cfg: \n%s', example_config())
 
     elif args.readme:
-        LOG.info('\n%s', README_CONTENTS)
+        LOG.info('\n%s', readme_contents())
 
     elif args.install_hook:
+        # verify the runlocation has a git repo
+        _get_repo(REPO_PATH)
         install_hook(args.install_hook)
 
     elif args.update:
         do_update(args.update)
 
     else:
+        # only the check itself needs the repo, so it isn't opened for the info/update paths
+        repo = _get_repo(REPO_PATH)
+        # the bumpversion config is only needed (and parsed) for checks without explicit files
+        files, file_regexes = args.files, args.file_regexes
+        if files is None or file_regexes is None:
+            cfg_files, cfg_file_regexes = _load_config_defaults()
+            files = cfg_files if files is None else files
+            file_regexes = cfg_file_regexes if file_regexes is None else file_regexes
         # for brevity & pylint, package version file & regex with others, pop later...
-        files = [args.version_file] + args.files
-        file_regexes = [args.version_regex] + args.file_regexes
+        files = [args.version_file] + files
+        file_regexes = [args.version_regex] + file_regexes
         base_commit = get_base_commit(repo, args.base)
-        do_check(base_commit, repo.commit(args.current), files, file_regexes)
+        do_check(base_commit, repo.commit(args.current), files, file_regexes,
+                 fail_fast=args.fail_fast)
 
 
 if __name__ == '__main__':
@@ -4,21 +4,47 @@ Utils for the version checker to work its magic
 Contains common public-exposed functions for cli to use etc.
 '''
 import configparser
+import functools
 import logging
 import os
-import re
+import shlex
 import shutil
 import subprocess
 import sys
 
 import semver
-from git.exc import BadName
 
-from version_checker.constants import LOG_NAME, CONFIG_FILE, OK, ERROR, BASES_IF_NONE
+try:
+    import regex as re  # optional (pip install base-version-checker[speed]), faster engine
+except ImportError:
+    import re
+
+try:
+    import tomllib
+except ImportError:  # python < 3.11, only ini configs are supported
+    tomllib = None
+
+from version_checker.constants import LOG_NAME, CONFIG_FILE, OK, ERROR, BASES_IF_NONE, \
+    DEFAULT_VERSION_REGEX
 
 
 LOG = logging.getLogger(LOG_NAME)
 
+# parsed bumpversion configs, keyed by (cfg path, cfg mtime) so edits invalidate the entry
+_CFG_CACHE = {}
+
+# {key} placeholders in bumpversion search text, filled from the toplevel options
+_CFG_KEY_RE = re.compile(r'\{(\w+)\}')
+
+# blobs larger than this are scanned in chunks rather than read whole
+_STREAM_THRESHOLD = 1024 * 1024
+_STREAM_CHUNK = 64 * 1024
+_STREAM_OVERLAP = 4 * 1024
+
+# recently read blob contents keyed by blob sha, small since entries can be up to the threshold
+_BLOB_CACHE = {}
+_BLOB_CACHE_SIZE = 8
+
 
 # utility functions
 def get_base_commit(repo, base_input):
@@ -37,14 +63,16 @@ def get_base_commit(repo, base_input):
     if base_input:
         return repo.commit(base_input)
 
+    import git  # pylint: disable=import-outside-toplevel
+
     LOG.info('No VERSION_BASE provided, trying: %s', ', '.join(BASES_IF_NONE))
+    # look up just the candidates, listing repo.refs would walk every branch & tag
     for possible_base in BASES_IF_NONE:
-        try:
-            base_commit = repo.commit(possible_base)
+        ref = git.RemoteReference(repo, f'refs/remotes/{possible_base}')
+        if ref.is_valid():
             LOG.info('Using %s', possible_base)
-            return base_commit
-        except BadName:
-            LOG.warning('%s not detected', possible_base)
+            return ref.commit
+        LOG.warning('%s not detected', possible_base)
     return _error('No VERSION_BASE provided, and default bases not valid!')
 
 
@@ -60,13 +88,20 @@ def compare_versions(old_version_str, new_version_str, abort=False):
 
     Returns boolean indicating success. May sys.exit(1) if abort is set to True
     '''
+    if old_version_str and old_version_str == new_version_str:
+        # identical text can never be an increase, no need to parse either side
+        LOG.info('\told version = %s', old_version_str)
+        LOG.info('\tnew version = %s', new_version_str)
+        _error('new version needs to be greater than old, see semver.org', abort=abort)
+        return False
+
     old_version, new_version = None, None
     try:
         if not old_version_str:
             LOG.warning('Old version empty, assuming brand new version')
         else:
-            old_version = semver.VersionInfo.parse(old_version_str)
-        new_version = semver.VersionInfo.parse(new_version_str)
+            old_version = _parse_version(old_version_str)
+        new_version = _parse_version(new_version_str)
     except ValueError as _exc:
         LOG.warning('One or more of the version files was un-parsable:', exc_info=_exc)
 
@@ -90,7 +125,7 @@ def compare_versions(old_version_str, new_version_str, abort=False):
     return False
 
 
-def do_check(base_commit, current_commit, files, file_regexes):
+def do_check(base_commit, current_commit, files, file_regexes, fail_fast=False):
     '''Checking functionality
 
     Verified the current file versions have been incremented from the base branch
@@ -101,35 +136,39 @@ def do_check(base_commit, current_commit, files, file_regexes):
     files           -- list of file paths with hardcoded versions ([0] = file to synchronize)
     file_regexes    -- list of regexes to check against relative file (in files)
 
+    Keyword arguments
+    fail_fast       -- boolean indicating whether to stop at the first mismatched file
+
     Returns True if check succeeded
     '''
-    LOG.debug(
-        '%s, %s, %s, %s', str(base_commit), str(current_commit), str(files), str(file_regexes))
+    # pylint: disable=too-many-return-statements,too-many-branches
+    LOG.debug('%s, %s, %s, %s', base_commit, current_commit, files, file_regexes)
 
     if not files or not file_regexes:
         return _error('No files or regexes provided!')
 
+    # nothing can have changed, skip the tree lookups & blob reads entirely
+    if base_commit == current_commit:
+        return _error(f'base and current both resolve to {current_commit}')
+
+    # compile each regex once up front, search_commit_file accepts either form
+    file_regexes = [_compiled(_r) for _r in file_regexes]
     version_file = files.pop(0)
     version_regex = file_regexes.pop(0)
 
-    # filter the changelist for the base version file, empty list if not found
-    version_file_diff = list(
-        filter(
-            lambda d: d.b_path == version_file,
-            base_commit.diff(current_commit).iter_change_type('M')))
     new, old = '', ''
 
-    if version_file not in base_commit.tree and version_file in current_commit.tree:
+    if not _has_file(base_commit, version_file) and _has_file(current_commit, version_file):
         LOG.warning(
-            '%s not found in base (%s), assuming new file...', version_file, str(base_commit))
-        new = search_commit_file(current_commit, version_file, version_regex)
-    elif not version_file_diff:
+            '%s not found in base (%s), assuming new file...', version_file, base_commit)
+        new = _search_version_file(current_commit, version_file, version_regex)
+    elif not _file_changed(base_commit, current_commit, version_file):
         return _error(f'{version_file} change not detected')
     else:
         # attempt to parse out new & old version from inputted version_file
         _ok(f'{version_file} change detected')
-        old = search_commit_file(base_commit, version_file, version_regex)
-        new = search_commit_file(current_commit, version_file, version_regex)
+        old = _search_version_file(base_commit, version_file, version_regex)
+        new = _search_version_file(current_commit, version_file, version_regex)
 
     if not compare_versions(old, new, abort=True):
         LOG.error('Version comparison failed')
@@ -143,16 +182,20 @@ def do_check(base_commit, current_commit, files, file_regexes):
     if len(file_regexes) != len(files):
         LOG.warning(
             'Inputted file regexes didnt match file list size, '
-            'defaulting to %s', version_regex)
+            'defaulting to %s', version_regex.pattern)
         file_regexes = [version_regex] * len(files)
 
     error_detected = False
-    LOG.debug('checking %s against regexes %s', str(files), str(file_regexes))
-    for _f, _r in zip(files, file_regexes):
-        file_version = search_commit_file(current_commit, _f, _r, abort=False)
-        if new not in file_version:
+    LOG.debug('checking %s against regexes %s', files, file_regexes)
+    # the new version must appear whole, i.e. 1.0.1 shouldn't be satisfied by 11.0.10
+    new_version_re = _compiled(rf'(?<!\d){re.escape(new)}(?!\d)')
+    file_versions = search_commit_files(current_commit, zip(files, file_regexes), abort=False)
+    for _f, file_version in zip(files, file_versions):
+        if not new_version_re.search(file_version):
             _error(f'\t{_f} needs to match {version_file}!', abort=False)
             error_detected = True
+            if fail_fast:
+                break
         else:
             LOG.debug('\t%s: %s', _f, file_version)
     if error_detected:
@@ -167,9 +210,9 @@ def do_update(version_part, options='--allow-dirty'):
 
     Just calls out to bump2version, relies on a .bumpversion.cfg
     '''
-    cmd = f'bump2version {version_part} {options}'
-    LOG.info("attempting command: '%s'", cmd)
-    LOG.info(subprocess.check_output(cmd, shell=True).decode())
+    cmd = ['bump2version', version_part] + shlex.split(options)
+    LOG.info("attempting command: '%s'", ' '.join(cmd))
+    LOG.info(subprocess.run(cmd, check=True, stdout=subprocess.PIPE).stdout.decode())
 
 
 def install_hook(hook):
@@ -185,19 +228,31 @@ def install_hook(hook):
         return
 
     hook_path = os.path.abspath(os.path.join('.', '.git', 'hooks', hook))
-    if os.path.exists(hook_path) or os.path.islink(hook_path):
+    try:
+        os.symlink(prog_path, hook_path)
+    except FileExistsError:
         _error(f'Git hook "{hook_path}" already exists!\n\tRemove the existing hook '
                 'and re-try if further action is desired.', use_long_text=False)
-    else:
-        os.symlink(prog_path, hook_path)
-        _ok(f'"{prog_path}", installed to "{hook_path}"')
+        return
+    _ok(f'"{prog_path}", installed to "{hook_path}"')
 
 
 def get_bumpversion_config(cfg_file=CONFIG_FILE):
     '''Helper to parse bumpversion configurations
 
     returns file, file regexes, and current version to be checked
+
+    Results are cached per config path & modification time, re-parsing only if the file changes
     '''
+    try:
+        cache_key = (os.fspath(cfg_file), os.stat(cfg_file).st_mtime_ns)
+    except OSError:
+        cache_key = None
+    if cache_key in _CFG_CACHE:
+        LOG.debug('using cached parse of %s', cfg_file)
+        files, file_regexes = _CFG_CACHE[cache_key]
+        return list(files), list(file_regexes)
+
     def _warn_invalid():
         # generator to shorthand warn the user of an invalid config
         LOG.warning('invalid bumpversion config detected %s skipping cfg parse...', cfg_file)
@@ -205,48 +260,53 @@ def get_bumpversion_config(cfg_file=CONFIG_FILE):
         LOG.warning('or see github.com/c4urself/bump2version for more details')
         return [], []
 
-    cfg = configparser.ConfigParser()
-
     try:
-        cfg.read(cfg_file)
-    except configparser.MissingSectionHeaderError:
+        with open(cfg_file, 'r', encoding='utf-8') as _f:
+            cfg_text = _f.read()
+    except OSError:
         return _warn_invalid()
 
-    if not cfg.has_section('bumpversion') or not cfg.has_option('bumpversion', 'current_version'):
+    # pyproject-style configs go through the (C-accelerated) toml parser, all else is ini
+    if os.fspath(cfg_file).endswith('.toml'):
+        parsed = _read_toml_config(cfg_text)
+    else:
+        parsed = _read_ini_config(cfg_text, os.fspath(cfg_file))
+    if parsed is None:
         return _warn_invalid()
 
-    current_version = cfg.get('bumpversion', 'current_version')
-    toplevel_options = cfg.options('bumpversion')
-    replace_dict = {o: cfg.get('bumpversion', o) for o in toplevel_options}
-    LOG.debug('toplevel (bumpversion) dict: %s', str(replace_dict))
+    replace_dict, file_searches = parsed
+    current_version = replace_dict['current_version']
+    LOG.debug('toplevel (bumpversion) dict: %s', replace_dict)
 
-    file_regexes = []
-    files = [s.split(':')[-1] for s in cfg.sections() if ':file:' in s]
-    for _f in files:
+    files, file_regexes = [], []
+    for _f, fsearch in file_searches:
         fregex = current_version
-        section = f'bumpversion:file:{_f}'
         # we only update if a search option is provided
-        if cfg.has_option(section, 'search'):
-            fregex = cfg.get(section, 'search')
+        if fsearch is not None:
             # this'd be easier if bump2version used interpolation but they dont...
             #   so we need to replace any {keys} at the bumpversion level with the values provided
-            for _k, _v in replace_dict.items():
-                # the key is probably current_version, we need to make it {current_version}...
-                fregex = fregex.replace('{' + str(_k) + '}', _v)
+            #   (the key is probably current_version), unknown {keys} are left as-is
+            fregex = _CFG_KEY_RE.sub(
+                lambda _m: replace_dict.get(_m.group(1), _m.group(0)), fsearch)
+        files.append(_f)
         file_regexes.append(fregex)
         LOG.debug('Added %s for %s', fregex, _f)
 
     LOG.info('Successfully parsed %s', cfg_file)
+    if cache_key:
+        _CFG_CACHE[cache_key] = (tuple(files), tuple(file_regexes))
     return files, file_regexes
 
 
 def search_commit_file(git_commit, fpath, search_regex, abort=True):
     '''Search a file in a source tree for some regex pattern
 
+    search_regex may be a raw regex string or a pre-compiled pattern
+
     Returns search text or empty string
     '''
     try:
-        commit_file = _get_commit_file(git_commit, fpath)
+        commit_file = _get_commit_file(git_commit, fpath, search_regex)
         return _search_or_error(search_regex, commit_file, abort=abort)
     except KeyError:
         _error(f'file {fpath} not found in the provided git.Commit {git_commit}', abort=abort)
@@ -255,21 +315,237 @@ def search_commit_file(git_commit, fpath, search_regex, abort=True):
     return ''
 
 
+def search_commit_files(git_commit, fpath_regexes, abort=True):
+    '''Search several files in one source tree, each for its own regex pattern
+
+    fpath_regexes is an iterable of (file path, regex) pairs
+
+    Repeated (file path, regex) pairs are only searched once
+
+    Yields search texts (or empty strings) lazily, in the same order as fpath_regexes
+    '''
+    found = {}
+    for _f, _r in fpath_regexes:
+        key = (_f, _compiled(_r))
+        if key not in found:
+            found[key] = search_commit_file(git_commit, _f, _r, abort=abort)
+        yield found[key]
+
+
+def compile_regex(regex):
+    '''Compile (and cache) a search regex up front
+
+    Raises ValueError for invalid patterns, so callers can reject them before any git work
+    '''
+    try:
+        return _compiled(regex)
+    except re.error as _exc:
+        raise ValueError(f'invalid regex {regex!r}: {_exc}') from _exc
+
+
 # (protected) helpers
-def _get_commit_file(fcommit, fpath):
-    '''Helper (shorthand) to extract file contents at a specific commit'''
-    return (fcommit.tree / fpath).data_stream.read().decode()
+def _has_file(fcommit, fpath):
+    '''Helper to check if a (possibly nested) path exists in a commit's tree
+
+    Only the trees along the path are read, unlike walking the whole tree
+    '''
+    try:
+        fcommit.tree / fpath  # pylint: disable=expression-not-assigned
+    except KeyError:
+        return False
+    return True
+
+
+def _file_changed(base_commit, current_commit, fpath):
+    '''Helper to check if a file was modified between two commits
+
+    Compares the blob shas found by direct tree lookups, so no diff is run
+    '''
+    try:
+        return (base_commit.tree / fpath).binsha != (current_commit.tree / fpath).binsha
+    except KeyError:
+        return False
+
+
+def _read_ini_config(cfg_text, source):
+    '''Helper to pull the toplevel options & file searches out of a .bumpversion.cfg
+
+    Returns (toplevel option dict, list of (file, search or None)), or None if invalid
+    '''
+    cfg = configparser.ConfigParser()
+    try:
+        cfg.read_string(cfg_text, source=source)
+    except configparser.MissingSectionHeaderError:
+        return None
+
+    if not cfg.has_section('bumpversion') or not cfg.has_option('bumpversion', 'current_version'):
+        return None
 
+    replace_dict = dict(cfg.items('bumpversion'))
+    file_searches = []
+    for section in cfg.sections():
+        if ':file:' in section:
+            fsearch = cfg.get(section, 'search', fallback=None)
+            file_searches.append((section.split(':')[-1], fsearch))
+    return replace_dict, file_searches
 
-def _search_or_error(regex_str, to_search_str, abort=True):
-    '''Helper to do a regex search and return matches, exits program on error'''
+
+def _read_toml_config(cfg_text):
+    '''Helper to pull the toplevel options & file searches out of a pyproject-style toml
+
+    Expects a [tool.bumpversion] table with [[tool.bumpversion.files]] entries
+
+    Returns (toplevel option dict, list of (file, search or None)), or None if invalid
+    '''
+    if tomllib is None:
+        LOG.warning('toml configs need python 3.11+ (tomllib)')
+        return None
+    try:
+        table = tomllib.loads(cfg_text).get('tool', {}).get('bumpversion', {})
+    except tomllib.TOMLDecodeError:
+        return None
+
+    if 'current_version' not in table:
+        return None
+
+    replace_dict = {k: str(v) for k, v in table.items() if not isinstance(v, (list, dict))}
+    file_searches = [
+        (_entry['filename'], _entry.get('search'))
+        for _entry in table.get('files', []) if 'filename' in _entry]
+    return replace_dict, file_searches
+
+
+def _search_version_file(fcommit, fpath, version_regex):
+    '''Helper to read the version out of the version file at a specific commit
+
+    pyproject-style toml configs give tool.bumpversion.current_version, a default regex search
+    there would likely hit a dependency pin first, all other files (and any explicitly given
+    version_regex) are searched with version_regex
+    '''
+    regex_str = version_regex if isinstance(version_regex, str) else version_regex.pattern
+    if tomllib is not None and fpath.endswith('.toml') and regex_str == DEFAULT_VERSION_REGEX:
+        try:
+            table = tomllib.loads(_as_str(_get_commit_file(fcommit, fpath)))
+            return str(table['tool']['bumpversion']['current_version'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            LOG.debug('no tool.bumpversion.current_version in %s, searching instead', fpath)
+    return search_commit_file(fcommit, fpath, version_regex)
+
+
+def _get_commit_file(fcommit, fpath, regex=None):
+    '''Helper (shorthand) to extract raw (undecoded) file contents at a specific commit
+
+    If a regex is provided & the blob is large, the blob is streamed in chunks and only
+    the window around the first match is returned (empty bytes if nothing matched),
+    unless the regex depends on its surroundings (see _is_streamable)
+    '''
+    blob = fcommit.tree / fpath
+    if regex is not None and blob.size > _STREAM_THRESHOLD \
+            and _is_streamable(_compiled(regex).pattern):
+        return _scan_stream(blob.data_stream, regex)
+    return _read_blob(blob)
+
+
+def _read_blob(blob):
+    '''Helper to read a blob's full contents, recent reads are cached by blob sha
+
+    Only the bytes are kept (not the blob, which would pin its repo & cat-file processes)
+    '''
+    data = _BLOB_CACHE.get(blob.binsha)
+    if data is None:
+        data = blob.data_stream.read()
+        _BLOB_CACHE[blob.binsha] = data
+        if len(_BLOB_CACHE) > _BLOB_CACHE_SIZE:
+            # dicts keep insertion order, so this evicts the oldest read
+            del _BLOB_CACHE[next(iter(_BLOB_CACHE))]
+    return data
+
+
+def _scan_stream(stream, regex, chunk_size=_STREAM_CHUNK):
+    '''Helper to read a stream chunk by chunk until the regex (or its raw text) shows up
+
+    Chunks overlap by _STREAM_OVERLAP bytes so short matches aren't split on a boundary,
+    one extra chunk is read after a hit so a greedy match isn't cut short
+
+    Windows start & end at arbitrary offsets, so this is only valid for patterns which
+    don't look at their surroundings (anchors, lookarounds, word boundaries), and for
+    matches shorter than the overlap
+
+    Returns the window containing the match (see _window_text), or empty bytes if not found
+    '''
+    pattern = _compiled(regex)
+    window = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return b''
+        window = window[-_STREAM_OVERLAP:] + chunk
+        text = _window_text(window)
+        if isinstance(text, str):
+            text_pattern = pattern
+        else:
+            text_pattern = _compiled(pattern.pattern.encode(), pattern.flags & ~re.UNICODE)
+        if text_pattern.search(text) or text_pattern.pattern in text:
+            return _window_text(window + stream.read(chunk_size))
+
+
+def _window_text(window):
+    '''Helper to give a stream window as-is if pure ASCII, otherwise decoded to text
+
+    Window edges can split a multi-byte character, those partial characters are dropped
+    '''
+    if _is_ascii(window):
+        return window
+    return window.decode(errors='replace').strip('\ufffd')
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_version(version_str):
+    '''Helper to parse & cache semver versions, the same few strings get compared repeatedly'''
+    return semver.VersionInfo.parse(version_str)
+
+
+@functools.lru_cache(maxsize=256)
+def _compiled(regex, flags=0):
+    '''Helper to compile & cache a regex, file checks tend to reuse the same few patterns
+
+    Already compiled patterns are rebuilt from their pattern & flags, the regex module
+    rejects stdlib re patterns (and vice versa)
+    '''
+    if not isinstance(regex, (str, bytes)):
+        regex, flags = regex.pattern, regex.flags
+    return re.compile(regex, flags)
+
+
+def _search_or_error(regex, to_search, abort=True):
+    '''Helper to do a regex search and return matches, exits program on error
+
+    Accepts either a raw regex string or a pre-compiled pattern (whose flags are kept)
+    Pure ASCII bytes are searched as-is with an ASCII pattern (skipping a full decode), as
+    bytes & text matching agree there, only the match itself is decoded. Anything else is
+    decoded & searched as text so unicode semantics (case folding, \\w, ".") still apply
+    '''
     retval = ''
-    result = re.search(regex_str, to_search_str)
-    LOG.debug('inputted: "%s"', to_search_str)
+    regex_str = regex if isinstance(regex, str) else regex.pattern
+    flags = 0 if isinstance(regex, str) else regex.flags
+    raw = isinstance(to_search, (bytes, bytearray))
+    LOG.debug('inputted: "%s"', to_search)
     LOG.debug('search txt: "%s"', regex_str)
+    # plain text (e.g. most bumpversion searches) needs no regex engine when present verbatim,
+    #   a literal is found at the same spot in utf-8 bytes as in the decoded text
+    if not flags & (re.IGNORECASE | re.VERBOSE) and _is_plain_text(regex_str) \
+            and (regex_str.encode() if raw else regex_str) in to_search:
+        return regex_str
+
+    if raw and not (_is_ascii(regex_str) and _is_ascii(to_search)):
+        to_search, raw = to_search.decode(), False
+    raw_needle = regex_str.encode() if raw else regex_str
+    # bytes patterns can't carry the UNICODE flag, all others (e.g. IGNORECASE) carry over
+    pattern = _compiled(raw_needle, flags & ~re.UNICODE) if raw else _compiled(regex)
+    result = pattern.search(to_search)
     if result:
-        retval = result.group(0)
-    elif regex_str in to_search_str:
+        retval = _as_str(result.group(0))
+    elif raw_needle in to_search:
         LOG.debug('regex parse failed, but raw string compare succeeded for "%s"', regex_str)
         retval = regex_str
     else:
@@ -277,6 +553,48 @@ def _search_or_error(regex_str, to_search_str, abort=True):
     return retval
 
 
+@functools.lru_cache(maxsize=256)
+def _is_plain_text(regex_str):
+    '''Helper to detect regexes that only match themselves, i.e. true literals
+
+    For those the first verbatim copy in a text is also the first regex match
+    '''
+    return not any(_c in regex_str for _c in '\\.^$*+?{}[]|()')
+
+
+@functools.lru_cache(maxsize=256)
+def _is_streamable(regex_str):
+    '''Helper to detect regexes which match the same in a stream window as in the full text
+
+    Rejects non-ASCII patterns (searched as text) & anything that can match differently at
+    an artificial window start or end, conservatively including negated classes ("[^")
+    '''
+    context_tokens = ('^', '$', r'\A', r'\Z', r'\b', r'\B', '(?<', '(?=', '(?!')
+    return _is_ascii(regex_str) and not any(_t in regex_str for _t in context_tokens)
+
+
+def _is_ascii(text):
+    '''Helper to check if str or bytes text is pure ASCII
+
+    str/bytes.isascii only exist on python 3.7+, older pythons go through the ascii codec
+    '''
+    if hasattr(text, 'isascii'):
+        return text.isascii()
+    try:
+        if isinstance(text, (bytes, bytearray)):
+            text.decode('ascii')
+        else:
+            text.encode('ascii')
+    except UnicodeError:
+        return False
+    return True
+
+
+def _as_str(text):
+    '''Helper to decode bytes (if needed) into a str'''
+    return text.decode() if isinstance(text, (bytes, bytearray)) else text
+
+
 def _ok(msg):
     '''Helper to print out an ok message'''
     LOG.info('%s... %s', msg, OK)